@@ -1,46 +1,94 @@
 import asyncio
-import contextlib
 import json
 import logging
+import os
 import re
+import time
 import urllib.parse
-import urllib.request
+from collections import OrderedDict
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Dict, Optional, Tuple
 
+import aiohttp
 from dotenv import load_dotenv
 from telethon import TelegramClient, events
 
 from config import load_config
 
+try:
+    import orjson
+except ImportError:  # optional, falls back to stdlib json
+    orjson = None
 
-ADDRESS_REGEX = re.compile(r"0x[a-fA-F0-9]{40}")
-TICKER_REGEX = re.compile(r"\$[A-Za-z0-9]{2,10}")
-# Solana-style mint address (base58) + common suffix variants like "pump"
-BASE58_MINT_REGEX = re.compile(r"\b[1-9A-HJ-NP-Za-km-z]{32,50}\b")
+
+_BASE58 = "[1-9A-HJ-NP-Za-km-z]"
+# Mints are 32-44 chars and must contain an uppercase letter and a digit,
+# which rejects long lowercase words before they reach DexScreener.
+_MINT = (
+    rf"(?={_BASE58}*[A-Z])(?={_BASE58}*[1-9])"
+    rf"{_BASE58}{{32,44}}(?![A-Za-z0-9])"
+)
+# One pass over the message: EVM address, $TICKER (without the "$"), or a
+# Solana-style mint address (base58, including suffix variants like "pump").
+# A "$" followed by a full mint is left to the mint branch, so "$<mint>" is
+# tracked as the mint rather than as its first ten characters.
+TOKEN_REGEX = re.compile(
+    r"(?P<address>0x[a-fA-F0-9]{40})"
+    rf"|\$(?!{_MINT})(?P<ticker>[A-Za-z0-9]{{2,10}})"
+    rf"|(?<![A-Za-z0-9])(?P<mint>{_MINT})"
+)
+
+
+def _dumps(obj: Any, pretty: bool = False) -> bytes:
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS if pretty else 0
+        return orjson.dumps(obj, option=option)
+    if pretty:
+        return json.dumps(obj, indent=2, sort_keys=True).encode("utf-8")
+    return json.dumps(obj).encode("utf-8")
+
+
+def _loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+DEXSCREENER_API = "https://api.dexscreener.com/latest/dex"
+_ADDR_URL = (DEXSCREENER_API + "/tokens/{}").format
+_SEARCH_URL = (DEXSCREENER_API + "/search/?q={}").format
+# DexScreener's /tokens endpoint accepts up to 30 comma-separated addresses.
+DEXSCREENER_BATCH_SIZE = 30
+# Market caps fetched within this window are reused instead of re-requested.
+MARKET_CAP_TTL_SEC = 30.0
+
+_UTC = timezone.utc
 
 
 def _utc_now_iso() -> str:
-    return datetime.now(timezone.utc).isoformat()
+    return datetime.now(_UTC).isoformat(timespec="seconds")
 
 
-def _format_percent(value: float) -> str:
-    return f"{value:+.2f}%"
+# Bound str.format avoids a Python-level call frame per percentage.
+_format_percent = "{:+.2f}%".format
+ZERO_PCT = "+0.00%"
 
 
 def _load_current(path: Path) -> Optional[Dict[str, Any]]:
-    if not path.exists():
+    try:
+        raw = path.read_bytes()
+    except FileNotFoundError:
         return None
     try:
-        data = json.loads(path.read_text())
+        data = _loads(raw)
         if isinstance(data, dict):
-            if isinstance(data.get("items"), dict):
+            items = data.get("items")
+            if isinstance(items, dict):
                 tokens = data.get("tokens") or []
                 if tokens:
-                    last_token = tokens[-1]
-                    return data["items"].get(last_token)
-                return next(iter(data["items"].values()), None)
+                    return items.get(tokens[-1])
+                return next(iter(items.values()), None)
             if "token" in data:
                 return data
     except Exception:
@@ -48,58 +96,123 @@ def _load_current(path: Path) -> Optional[Dict[str, Any]]:
     return None
 
 
+def _write_atomic(path: Path, payload: bytes) -> None:
+    # Readers never see a truncated file; no fsync, the page cache is enough.
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(payload)
+    os.replace(tmp, path)
+
+
 def _save_current(path: Path, entry: Dict[str, Any]) -> None:
-    path.write_text(json.dumps(entry, indent=2, sort_keys=True))
+    _write_atomic(path, _dumps(entry, pretty=True))
 
 
-def _load_history(path: Path) -> list:
-    if not path.exists():
-        return []
-    try:
-        data = json.loads(path.read_text())
-        if isinstance(data, list):
-            return data
-        if isinstance(data, dict):
-            if isinstance(data.get("items"), dict):
-                return list(data["items"].values())
-            if "token" in data:
-                return [data]
-    except Exception:
-        pass
-    return []
+def _save_current_fast(path: Path, entry: Dict[str, Any]) -> None:
+    # Per-tick write from the monitor: compact and unsorted, since entries
+    # always carry the same keys.
+    _write_atomic(path, _dumps(entry))
+
+
+class HistoryStore:
+    """Append-only NDJSON token history.
 
+    The file is never re-read; appends go to a handle kept open for the
+    lifetime of the bot.
+    """
 
-def _append_history(path: Path, entry: Dict[str, Any]) -> None:
-    history = _load_history(path)
-    history.append(entry)
-    path.write_text(json.dumps(history, indent=2, sort_keys=True))
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._handle = path.open("a+b")
+        # Terminate a partial line from an interrupted write so the next
+        # entry starts on its own line instead of being glued onto it.
+        if self._handle.seek(0, os.SEEK_END):
+            self._handle.seek(-1, os.SEEK_END)
+            if self._handle.read(1) != b"\n":
+                self._handle.write(b"\n")
+                self._handle.flush()
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        self._handle.write(_dumps(entry) + b"\n")
+        self._handle.flush()
+
+    def close(self) -> None:
+        self._handle.close()
+
+
+def _migrate_history(path: Path) -> None:
+    """Rewrite a legacy pretty-printed JSON history file as NDJSON."""
+    for source in (path, path.with_suffix(".json")):
+        try:
+            raw = source.read_bytes()
+            break
+        except FileNotFoundError:
+            continue
+    else:
+        return
+    try:
+        data = _loads(raw)
+    except ValueError:
+        # Not a single JSON document, so it is already NDJSON.
+        return
+    if isinstance(data, list):
+        history = data
+    elif isinstance(data, dict) and isinstance(data.get("items"), dict):
+        history = list(data["items"].values())
+    elif isinstance(data, dict) and "token" in data:
+        history = [data]
+    else:
+        return
+    _write_atomic(path, b"".join(_dumps(item) + b"\n" for item in history))
+    logging.info("Migrated history %s to NDJSON at %s", source, path)
 
 
-def _http_get_json(url: str, timeout_sec: int = 15) -> Dict[str, Any]:
-    req = urllib.request.Request(
-        url,
+def _make_http_session() -> aiohttp.ClientSession:
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit_per_host=4),
         headers={
             "User-Agent": "Mozilla/5.0 (compatible; TokenBot/1.0)",
             "Accept": "application/json",
         },
     )
-    with urllib.request.urlopen(req, timeout=timeout_sec) as resp:
-        return json.loads(resp.read().decode("utf-8"))
+
+
+# Shared keep-alive session, created in main() once the event loop is running.
+_HTTP: Optional[aiohttp.ClientSession] = None
+
+
+# url -> (ETag, parsed body) so unchanged responses skip the JSON parse.
+# Kept as a small LRU: one-off batch and search URLs would otherwise pile up.
+ETAG_CACHE_SIZE = 32
+_ETAG_CACHE: "OrderedDict[str, Tuple[str, Dict[str, Any]]]" = OrderedDict()
+
+
+async def _http_get_json(url: str, timeout_sec: int = 15) -> Dict[str, Any]:
+    timeout = aiohttp.ClientTimeout(total=timeout_sec)
+    cached = _ETAG_CACHE.get(url)
+    headers = {"If-None-Match": cached[0]} if cached else None
+    async with _HTTP.get(url, timeout=timeout, headers=headers) as resp:
+        if resp.status == 304 and cached:
+            _ETAG_CACHE.move_to_end(url)
+            return cached[1]
+        resp.raise_for_status()
+        data = _loads(await resp.read())
+        etag = resp.headers.get("ETag")
+        if etag:
+            _ETAG_CACHE[url] = (etag, data)
+            _ETAG_CACHE.move_to_end(url)
+            if len(_ETAG_CACHE) > ETAG_CACHE_SIZE:
+                _ETAG_CACHE.popitem(last=False)
+        return data
+
+
+def _liquidity_usd(pair: Dict[str, Any]) -> float:
+    # DexScreener reports liquidity as a JSON number, so no float() parsing.
+    liquidity = (pair.get("liquidity") or {}).get("usd")
+    return liquidity if isinstance(liquidity, (int, float)) else 0.0
 
 
 def _pick_best_pair(pairs: list) -> Optional[Dict[str, Any]]:
-    best = None
-    best_liquidity = -1.0
-    for pair in pairs or []:
-        liquidity = pair.get("liquidity", {}).get("usd") or 0
-        try:
-            liquidity_val = float(liquidity)
-        except (TypeError, ValueError):
-            liquidity_val = 0.0
-        if liquidity_val > best_liquidity:
-            best = pair
-            best_liquidity = liquidity_val
-    return best
+    return max(pairs or (), key=_liquidity_usd, default=None)
 
 
 def _parse_market_cap(pair: Dict[str, Any]) -> Optional[float]:
@@ -114,20 +227,71 @@ def _parse_market_cap(pair: Dict[str, Any]) -> Optional[float]:
         return None
 
 
-def _fetch_market_cap_for_address(address: str) -> Tuple[Optional[float], Optional[str]]:
-    url = f"https://api.dexscreener.com/latest/dex/tokens/{address}"
-    data = _http_get_json(url)
-    pairs = data.get("pairs") or []
-    best = _pick_best_pair(pairs)
-    if not best:
-        return None, None
-    return _parse_market_cap(best), best.get("url")
+# token key -> (monotonic time fetched, (market cap, pair url))
+_MC_CACHE: Dict[str, Tuple[float, Tuple[Optional[float], Optional[str]]]] = {}
+# token key -> lookup in progress, so concurrent callers share one request
+_MC_INFLIGHT: Dict[str, "asyncio.Future[Tuple[Optional[float], Optional[str]]]"] = {}
+
+
+def _market_cap_cache_key(token_key: str) -> str:
+    return token_key.lower() if token_key.startswith("0x") else token_key
 
 
-def _fetch_market_cap_for_ticker(ticker: str) -> Tuple[Optional[float], Optional[str]]:
-    query = urllib.parse.quote(ticker)
-    url = f"https://api.dexscreener.com/latest/dex/search/?q={query}"
-    data = _http_get_json(url)
+def _cached_market_cap(
+    token_key: str,
+) -> Optional[Tuple[Optional[float], Optional[str]]]:
+    hit = _MC_CACHE.get(_market_cap_cache_key(token_key))
+    if hit and time.monotonic() - hit[0] < MARKET_CAP_TTL_SEC:
+        return hit[1]
+    return None
+
+
+def _cache_market_cap(
+    token_key: str, result: Tuple[Optional[float], Optional[str]]
+) -> None:
+    now = time.monotonic()
+    # Drop expired entries so tokens seen once do not stay in memory forever.
+    expired = [
+        key for key, (ts, _) in _MC_CACHE.items() if now - ts >= MARKET_CAP_TTL_SEC
+    ]
+    for key in expired:
+        del _MC_CACHE[key]
+    _MC_CACHE[_market_cap_cache_key(token_key)] = (now, result)
+
+
+async def _fetch_market_caps_for_addresses(
+    addresses: list,
+) -> Dict[str, Tuple[Optional[float], Optional[str]]]:
+    """Look up many addresses at once; keys are lowercased addresses."""
+    results: Dict[str, Tuple[Optional[float], Optional[str]]] = {}
+    pending = []
+    for address in dict.fromkeys(raw.lower() for raw in addresses):
+        cached = _cached_market_cap(address)
+        if cached is not None:
+            results[address] = cached
+        else:
+            pending.append(address)
+    for start in range(0, len(pending), DEXSCREENER_BATCH_SIZE):
+        batch = pending[start : start + DEXSCREENER_BATCH_SIZE]
+        data = await _http_get_json(_ADDR_URL(",".join(batch)))
+        grouped: Dict[str, list] = {}
+        for pair in data.get("pairs") or []:
+            base_address = (pair.get("baseToken") or {}).get("address") or ""
+            grouped.setdefault(base_address.lower(), []).append(pair)
+        for address in batch:
+            best = _pick_best_pair(grouped.get(address, []))
+            results[address] = (
+                (_parse_market_cap(best), best.get("url")) if best else (None, None)
+            )
+            _cache_market_cap(address, results[address])
+    return results
+
+
+async def _fetch_market_cap_for_ticker(
+    ticker: str,
+) -> Tuple[Optional[float], Optional[str]]:
+    # safe="" so "/", "$" and friends are escaped inside the query value.
+    data = await _http_get_json(_SEARCH_URL(urllib.parse.quote(ticker, safe="")))
     pairs = data.get("pairs") or []
     best = _pick_best_pair(pairs)
     if not best:
@@ -135,22 +299,50 @@ def _fetch_market_cap_for_ticker(ticker: str) -> Tuple[Optional[float], Optional
     return _parse_market_cap(best), best.get("url")
 
 
-async def fetch_market_cap(token_key: str) -> Tuple[Optional[float], Optional[str]]:
+async def _fetch_market_cap_uncached(
+    token_key: str,
+) -> Tuple[Optional[float], Optional[str]]:
     if token_key.startswith("0x"):
-        return await asyncio.to_thread(_fetch_market_cap_for_address, token_key)
-    return await asyncio.to_thread(_fetch_market_cap_for_ticker, token_key)
+        # Same pair selection as the handler's batch path, so the initial and
+        # monitored market caps always come from the token's own pairs.
+        results = await _fetch_market_caps_for_addresses([token_key])
+        result = results[token_key.lower()]
+    else:
+        result = await _fetch_market_cap_for_ticker(token_key)
+    _cache_market_cap(token_key, result)
+    return result
+
+
+async def fetch_market_cap(token_key: str) -> Tuple[Optional[float], Optional[str]]:
+    cached = _cached_market_cap(token_key)
+    if cached is not None:
+        return cached
+    key = _market_cap_cache_key(token_key)
+    future = _MC_INFLIGHT.get(key)
+    if future is None:
+        future = asyncio.ensure_future(_fetch_market_cap_uncached(token_key))
+        _MC_INFLIGHT[key] = future
+        future.add_done_callback(lambda _: _MC_INFLIGHT.pop(key, None))
+    # Shield so one cancelled caller does not abort the shared lookup.
+    return await asyncio.shield(future)
 
 
 async def _refresh_entry_market_cap(
     token_key: str, entry: Dict[str, Any]
 ) -> None:
     market_cap, pair_url = await fetch_market_cap(token_key)
+    _apply_initial_market_cap(entry, market_cap, pair_url)
+
+
+def _apply_initial_market_cap(
+    entry: Dict[str, Any], market_cap: Optional[float], pair_url: Optional[str]
+) -> None:
     if market_cap is None:
         return
     entry["initial_market_cap"] = market_cap
     entry["highest_market_cap"] = market_cap
     entry["current_market_cap"] = market_cap
-    entry["current_percentage"] = _format_percent(0.0)
+    entry["current_percentage"] = ZERO_PCT
     entry["highest_percent_increase"] = 0.0
     entry["reached_50"] = False
     entry["last_checked"] = _utc_now_iso()
@@ -164,55 +356,79 @@ async def market_cap_monitor(
     path = Path(config.output_json_path)
     while True:
         await asyncio.sleep(config.price_check_interval_sec)
-        async with lock:
-            entry = current_holder.get("entry")
-        if not entry:
-            continue
-        token_key = entry.get("token")
-        if not token_key:
-            continue
-        market_cap, pair_url = await fetch_market_cap(token_key)
-        if market_cap is None:
-            continue
-        async with lock:
-            entry = current_holder.get("entry")
-            if not entry or entry.get("token") != token_key:
+        # A failed tick (network error, timeout) is logged and retried on the
+        # next interval instead of ending the monitor for good.
+        try:
+            async with lock:
+                entry = current_holder.get("entry")
+            if not entry:
                 continue
-            initial_market_cap = entry.get("initial_market_cap")
-            highest_market_cap = entry.get(
-                "highest_market_cap", initial_market_cap or market_cap
-            )
-            if initial_market_cap is None:
-                initial_market_cap = market_cap
-                entry["initial_market_cap"] = market_cap
-            if market_cap > highest_market_cap:
-                highest_market_cap = market_cap
-                entry["highest_market_cap"] = highest_market_cap
-            entry["current_market_cap"] = market_cap
-            current_percent = (
-                ((market_cap - initial_market_cap) / initial_market_cap) * 100
-                if initial_market_cap
-                else 0.0
-            )
-            current_percent = round(current_percent, 4)
-            entry["current_percentage"] = _format_percent(current_percent)
-            highest_percent = (
-                ((highest_market_cap - initial_market_cap) / initial_market_cap) * 100
-                if initial_market_cap
-                else 0.0
-            )
-            highest_percent = round(highest_percent, 4)
-            entry["highest_percent_increase"] = max(
-                entry.get("highest_percent_increase", 0.0), highest_percent
-            )
-            entry["reached_50"] = highest_percent >= 50.0
-            entry["last_checked"] = _utc_now_iso()
-            if pair_url:
-                entry["pair_url"] = pair_url
-            _save_current(path, entry)
+            token_key = entry.get("token")
+            if not token_key:
+                continue
+            market_cap, pair_url = await fetch_market_cap(token_key)
+            if market_cap is None:
+                continue
+            checked_at = _utc_now_iso()
+            async with lock:
+                entry = current_holder.get("entry")
+                if not entry or entry.get("token") != token_key:
+                    continue
+                get = entry.get
+                initial_market_cap = get("initial_market_cap")
+                if initial_market_cap is None:
+                    initial_market_cap = market_cap
+                highest_market_cap = max(
+                    get("highest_market_cap") or initial_market_cap, market_cap
+                )
+                if initial_market_cap:
+                    current_percent = round(
+                        (market_cap - initial_market_cap) / initial_market_cap * 100, 4
+                    )
+                    highest_percent = round(
+                        (highest_market_cap - initial_market_cap)
+                        / initial_market_cap
+                        * 100,
+                        4,
+                    )
+                else:
+                    current_percent = highest_percent = 0.0
+                entry.update(
+                    {
+                        "initial_market_cap": initial_market_cap,
+                        "highest_market_cap": highest_market_cap,
+                        "current_market_cap": market_cap,
+                        "current_percentage": _format_percent(current_percent),
+                        "highest_percent_increase": max(
+                            get("highest_percent_increase") or 0.0, highest_percent
+                        ),
+                        "reached_50": highest_percent >= 50.0,
+                        "last_checked": checked_at,
+                    }
+                )
+                if pair_url:
+                    entry["pair_url"] = pair_url
+                # Disk I/O runs in a worker thread so the event loop keeps
+                # receiving updates; the lock stays held so writes land in order.
+                await asyncio.to_thread(_save_current_fast, path, entry)
+        except Exception as exc:
+            logging.exception("Monitor error: %s", exc)
+
+
+async def saved_messages_forwarder(client, queue: "asyncio.Queue[str]") -> None:
+    # Drains texts queued by the handler so it never waits on Telegram.
+    while True:
+        text = await queue.get()
+        try:
+            await client.send_message("me", text)
+        except Exception as exc:
+            logging.exception("Forward error: %s", exc)
+        finally:
+            queue.task_done()
 
 
 async def main() -> None:
+    global _HTTP
     load_dotenv()
     config = load_config()
     logging.basicConfig(
@@ -223,132 +439,159 @@ async def main() -> None:
     client = TelegramClient("userbot_session", config.api_id, config.api_hash)
     results_path = Path(config.output_json_path)
     history_path = Path(config.history_json_path)
-    current_entry = _load_current(results_path)
-    results_lock = asyncio.Lock()
-    current_holder: Dict[str, Optional[Dict[str, Any]]] = {"entry": current_entry}
-
-    if current_entry:
-        async with results_lock:
-            if "initial_price" in current_entry or "highest_price" in current_entry:
-                current_entry.pop("initial_price", None)
-                current_entry.pop("highest_price", None)
-            if "percent_increase" in current_entry:
-                raw_value = current_entry.pop("percent_increase")
-                if isinstance(raw_value, (int, float)):
-                    current_entry["current_percentage"] = _format_percent(float(raw_value))
-                else:
-                    current_entry["current_percentage"] = raw_value
-            if "current_percentage" not in current_entry:
-                current_entry["current_percentage"] = _format_percent(0.0)
-                
-            if current_entry.get("initial_market_cap") is None:
-                await _refresh_entry_market_cap(current_entry["token"], current_entry)
-            if current_entry.get("highest_percent_increase") is None:
-                current_entry["highest_percent_increase"] = 0.0
-            _save_current(results_path, current_entry)
-
-    if config.static_tokens and not current_holder["entry"]:
-        async with results_lock:
-            token_key = config.static_tokens[-1]
-            entry = {
-                "token": token_key,
-                "time_posted": _utc_now_iso(),
-                "initial_market_cap": None,
-                "highest_market_cap": None,
-                "current_market_cap": None,
-                    "current_percentage": _format_percent(0.0),
-                "highest_percent_increase": 0.0,
-                "reached_50": False,
-                "last_checked": None,
-                "pair_url": None,
-            }
-            await _refresh_entry_market_cap(token_key, entry)
-            current_holder["entry"] = entry
-            _save_current(results_path, entry)
-
-    @client.on(events.NewMessage)
-    async def handler(event: events.NewMessage.Event) -> None:
-        try:
-            message = event.raw_text or ""
-
-            if config.discovery_mode:
-                logging.info(
-                    "Discovery message: chat_id=%s sender_id=%s text=%s",
-                    event.chat_id,
-                    event.sender_id,
-                    message,
-                )
-                await client.send_message(
-                    "me",
-                    f"Discovery message\nchat_id: {event.chat_id}\n"
-                    f"sender_id: {event.sender_id}\ntext: {message}",
-                )
-                return
-
-            # Only allow messages from whitelisted groups
-            if event.chat_id not in config.group_ids:
-                return
-            # If USER_IDS is empty, allow all senders in the group.
-            if config.user_ids and event.sender_id not in config.user_ids:
-                return
-
-            addresses = ADDRESS_REGEX.findall(message)
-            tickers = [t[1:] for t in TICKER_REGEX.findall(message)]
-            base58_mints = BASE58_MINT_REGEX.findall(message)
-            tokens = addresses + tickers + base58_mints
-            if not tokens:
-                return
-
-            logging.info(
-                "Token message: chat_id=%s sender_id=%s tokens=%s",
-                event.chat_id,
-                event.sender_id,
-                ", ".join(tokens),
-            )
+    _migrate_history(history_path)
+    history = HistoryStore(history_path)
+    _HTTP = _make_http_session()
+    tasks: list = []
+    # Everything from here on runs under the finally below, so a startup
+    # failure (DexScreener timeout, Telegram login) still releases the
+    # HTTP session and the history file.
+    try:
+        current_entry = _load_current(results_path)
+        results_lock = asyncio.Lock()
+        forward_queue: "asyncio.Queue[str]" = asyncio.Queue()
+        current_holder: Dict[str, Optional[Dict[str, Any]]] = {"entry": current_entry}
 
+        if current_entry:
             async with results_lock:
-                for token_key in tokens:
-                    current_entry = current_holder.get("entry")
-                    if current_entry and current_entry.get("token") == token_key:
-                        continue
-                    if current_entry:
-                        _append_history(history_path, dict(current_entry))
-                    entry = {
-                        "token": token_key,
-                        "time_posted": event.date.astimezone(timezone.utc).isoformat(),
-                        "initial_market_cap": None,
-                        "highest_market_cap": None,
-                        "current_market_cap": None,
-                        "current_percentage": _format_percent(0.0),
-                        "highest_percent_increase": 0.0,
-                        "reached_50": False,
-                        "last_checked": None,
-                        "pair_url": None,
-                    }
-                    await _refresh_entry_market_cap(token_key, entry)
-                    current_holder["entry"] = entry
-                    _save_current(results_path, entry)
-
-            if config.forward_to_saved:
-                await client.send_message(
-                    "me",
-                    f"Group message\nchat_id: {event.chat_id}\n"
-                    f"sender_id: {event.sender_id}\ntext: {message}",
+                if "initial_price" in current_entry or "highest_price" in current_entry:
+                    current_entry.pop("initial_price", None)
+                    current_entry.pop("highest_price", None)
+                if "percent_increase" in current_entry:
+                    raw_value = current_entry.pop("percent_increase")
+                    if isinstance(raw_value, (int, float)):
+                        current_entry["current_percentage"] = _format_percent(float(raw_value))
+                    else:
+                        current_entry["current_percentage"] = raw_value
+                if "current_percentage" not in current_entry:
+                    current_entry["current_percentage"] = ZERO_PCT
+
+                if current_entry.get("initial_market_cap") is None:
+                    await _refresh_entry_market_cap(current_entry["token"], current_entry)
+                if current_entry.get("highest_percent_increase") is None:
+                    current_entry["highest_percent_increase"] = 0.0
+                _save_current(results_path, current_entry)
+
+        if config.static_tokens and not current_holder["entry"]:
+            async with results_lock:
+                token_key = config.static_tokens[-1]
+                entry = {
+                    "token": token_key,
+                    "time_posted": _utc_now_iso(),
+                    "initial_market_cap": None,
+                    "highest_market_cap": None,
+                    "current_market_cap": None,
+                    "current_percentage": ZERO_PCT,
+                    "highest_percent_increase": 0.0,
+                    "reached_50": False,
+                    "last_checked": None,
+                    "pair_url": None,
+                }
+                await _refresh_entry_market_cap(token_key, entry)
+                current_holder["entry"] = entry
+                _save_current(results_path, entry)
+
+        @client.on(events.NewMessage)
+        async def handler(event: events.NewMessage.Event) -> None:
+            try:
+                message = event.raw_text or ""
+
+                if config.discovery_mode:
+                    logging.info(
+                        "Discovery message: chat_id=%s sender_id=%s text=%s",
+                        event.chat_id,
+                        event.sender_id,
+                        message,
+                    )
+                    forward_queue.put_nowait(
+                        f"Discovery message\nchat_id: {event.chat_id}\n"
+                        f"sender_id: {event.sender_id}\ntext: {message}"
+                    )
+                    return
+
+                # Only allow messages from whitelisted groups
+                if event.chat_id not in config.group_ids:
+                    return
+                # If USER_IDS is empty, allow all senders in the group.
+                if config.user_ids and event.sender_id not in config.user_ids:
+                    return
+
+                # De-duplicate in the same pass so a repeated $TICKER costs nothing.
+                tokens = list(
+                    dict.fromkeys(
+                        match.group(match.lastgroup)
+                        for match in TOKEN_REGEX.finditer(message)
+                    )
+                )
+                if not tokens:
+                    return
+
+                if logging.getLogger().isEnabledFor(logging.INFO):
+                    logging.info(
+                        "Token message: chat_id=%s sender_id=%s tokens=%s",
+                        event.chat_id,
+                        event.sender_id,
+                        ", ".join(tokens),
+                    )
+
+                # One request for every address in the message; tickers and mints
+                # are still looked up individually below.
+                address_caps = await _fetch_market_caps_for_addresses(
+                    [token for token in tokens if token.startswith("0x")]
                 )
-        except Exception as exc:
-            logging.exception("Handler error: %s", exc)
 
-    await client.start()
-    monitor_task = asyncio.create_task(
-        market_cap_monitor(config, current_holder, results_lock)
-    )
-    logging.info("Userbot started. Listening for messages...")
-    try:
+                async with results_lock:
+                    for token_key in tokens:
+                        current_entry = current_holder.get("entry")
+                        if current_entry and current_entry.get("token") == token_key:
+                            continue
+                        if current_entry:
+                            await asyncio.to_thread(history.append, dict(current_entry))
+                        entry = {
+                            "token": token_key,
+                            "time_posted": event.date.astimezone(_UTC).isoformat(),
+                            "initial_market_cap": None,
+                            "highest_market_cap": None,
+                            "current_market_cap": None,
+                            "current_percentage": ZERO_PCT,
+                            "highest_percent_increase": 0.0,
+                            "reached_50": False,
+                            "last_checked": None,
+                            "pair_url": None,
+                        }
+                        if token_key.startswith("0x"):
+                            market_cap, pair_url = address_caps[token_key.lower()]
+                            _apply_initial_market_cap(entry, market_cap, pair_url)
+                        else:
+                            await _refresh_entry_market_cap(token_key, entry)
+                        current_holder["entry"] = entry
+                        await asyncio.to_thread(_save_current, results_path, entry)
+
+                if config.forward_to_saved:
+                    forward_queue.put_nowait(
+                        f"Group message\nchat_id: {event.chat_id}\n"
+                        f"sender_id: {event.sender_id}\ntext: {message}"
+                    )
+            except Exception as exc:
+                logging.exception("Handler error: %s", exc)
+
+        await client.start()
+        monitor = market_cap_monitor(config, current_holder, results_lock)
+        tasks.append(asyncio.create_task(monitor))
+        forwarder = saved_messages_forwarder(client, forward_queue)
+        tasks.append(asyncio.create_task(forwarder))
+        logging.info("Userbot started. Listening for messages...")
         await client.run_until_disconnected()
     finally:
-        monitor_task.cancel()
-        with contextlib.suppress(asyncio.CancelledError):
-            await monitor_task
+        try:
+            for task in tasks:
+                task.cancel()
+            for result in await asyncio.gather(*tasks, return_exceptions=True):
+                if isinstance(result, Exception):
+                    logging.error("Background task failed: %r", result)
+        finally:
+            await _HTTP.close()
+            history.close()
 
 
 if __name__ == "__main__":
@@ -1,6 +1,6 @@
 import os
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import FrozenSet, List, Optional
 
 
 def _get_env(name: str, required: bool = True, default: Optional[str] = None) -> str:
@@ -10,10 +10,10 @@ def _get_env(name: str, required: bool = True, default: Optional[str] = None) ->
     return value or ""
 
 
-def _parse_int_list(value: str) -> List[int]:
+def _parse_int_set(value: str) -> FrozenSet[int]:
     if not value:
-        return []
-    return [int(item.strip()) for item in value.split(",") if item.strip()]
+        return frozenset()
+    return frozenset(int(item.strip()) for item in value.split(",") if item.strip())
 
 
 def _parse_str_list(value: str) -> List[str]:
@@ -26,8 +26,8 @@ def _parse_str_list(value: str) -> List[str]:
 class Config:
     api_id: int
     api_hash: str
-    group_ids: List[int]
-    user_ids: List[int]
+    group_ids: FrozenSet[int]
+    user_ids: FrozenSet[int]
     private_key: str
     rpc_url: str
     router_address: str
@@ -51,8 +51,8 @@ def load_config() -> Config:
 
     api_id = int(_get_env("API_ID"))
     api_hash = _get_env("API_HASH")
-    group_ids = _parse_int_list(_get_env("GROUP_IDS", required=not discovery_mode, default=""))
-    user_ids = _parse_int_list(_get_env("USER_IDS", required=False, default=""))
+    group_ids = _parse_int_set(_get_env("GROUP_IDS", required=not discovery_mode, default=""))
+    user_ids = _parse_int_set(_get_env("USER_IDS", required=False, default=""))
     private_key = _get_env("PRIVATE_KEY", required=trading_enabled, default="")
     rpc_url = _get_env("RPC_URL", required=trading_enabled, default="")
     router_address = _get_env("DEX_ROUTER_ADDRESS", required=trading_enabled, default="")
@@ -65,7 +65,7 @@ def load_config() -> Config:
     forward_to_saved = os.getenv("FORWARD_TO_SAVED", "0").lower() in ("1", "true", "yes")
     price_check_interval_sec = int(os.getenv("PRICE_CHECK_INTERVAL_SEC", "60"))
     output_json_path = os.getenv("OUTPUT_JSON_PATH", "token_results.json")
-    history_json_path = os.getenv("HISTORY_JSON_PATH", "token_history.json")
+    history_json_path = os.getenv("HISTORY_JSON_PATH", "token_history.ndjson")
     static_tokens = _parse_str_list(os.getenv("STATIC_TOKENS", ""))
 
     if not discovery_mode: